@@ -1,10 +1,53 @@
+import base64
+import gzip
+import hashlib
+import io
 import os
+import tempfile
+import threading
+import time
 import pandas as pd
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
-from datetime import datetime, timedelta
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+from datetime import date, datetime, timedelta
 from flask import Flask, render_template, request, redirect
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
+from jinja2.utils import htmlsafe_json_dumps
+
+# Lock tra processi per scegliere chi scrive la copia Feather (non disponibile su Windows:
+# lì c'è comunque un solo processo)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Campionamento LTTB compilato (Rust/SIMD), se disponibile; altrimenti si usa la versione NumPy
+try:
+    from tsdownsample import LTTBDownsampler
+except ImportError:
+    LTTBDownsampler = None
+
+# Serializzazione JSON con orjson, usata sia da jsonify sia dal filtro tojson dei template
+class ORJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Il template (templates/index.html) viene compilato una volta sola: il codice Python generato
+# da Jinja resta su disco e viene riusato dai worker e dopo un riavvio
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
 # Definizione dei sensori da visualizzare
 SENSORS = {
@@ -14,87 +57,532 @@ SENSORS = {
     'env_pressure': {'name': 'Pressione Ambientale', 'unit': 'hPa'}
 }
 
+# Funzione per serializzare un valore fisso una volta sola, già pronto (e sicuro) per lo script della pagina
+def template_json(obj):
+    return htmlsafe_json_dumps(obj, dumps=app.json.dumps)
+
+# Sensori in JSON per lo script della pagina, non cambiano mai
+SENSORS_JSON = template_json(SENSORS)
+
+# Colonne del CSV usate dalla dashboard (le colonne di stato di pompa e valvola non vengono mostrate)
+CSV_COLUMNS = ['timestamp'] + list(SENSORS)
+
 # Percorso del file CSV
 CSV_PATH = os.path.expanduser('~/telemetria.csv')
 
+# Copia binaria (Feather) del CSV già tipizzato, molto più veloce da rileggere
+FEATHER_PATH = os.path.splitext(CSV_PATH)[0] + '.feather'
+
 # Massimo numero di punti da visualizzare per sensore
-MAX_POINTS = 300
+MAX_POINTS = 2000
 
 # Impostazione globale per il campionamento
-ENABLE_SAMPLING = False  # Imposta False per disabilitare il campionamento
+ENABLE_SAMPLING = True  # Imposta False per disabilitare il campionamento
 
-# Funzione per caricare e processare i dati
-def process_data(start_date=None, end_date=None):
-    # Usa direttamente la variabile globale
-    enable_sampling = ENABLE_SAMPLING
+# Numero di risposte (JSON di /api/data e pagine, anche compresse) tenute in cache
+PAYLOAD_CACHE_SIZE = 64
+
+# Numero di intervalli di date di cui tenere in cache le serie ricampionate
+SERIES_CACHE_SIZE = 8
+
+# Intervallo (in secondi) con cui il thread in background controlla se il CSV è cambiato
+WATCH_INTERVAL = 5
+
+# Compressione gzip delle risposte: tipi compressi, dimensione minima (in byte) e livello
+COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 6
+
+# Suffisso dell'ETag delle risposte compresse: il corpo è diverso, quindi anche l'ETag (forte)
+GZIP_ETAG_SUFFIX = '-gz'
+
+# Intervallo minimo (in secondi) tra due riscritture della copia Feather
+FEATHER_WRITE_INTERVAL = 300
+
+# Numero di byte iniziali del CSV usati per riconoscerlo quando si riparte dalla copia Feather
+FINGERPRINT_SIZE = 4096
+
+# Tipi delle colonne del CSV per il lettore PyArrow
+CSV_COLUMN_TYPES = {'timestamp': pa.timestamp('ns'), **{sensor: pa.float32() for sensor in SENSORS}}
+
+# Durata di un minuto in nanosecondi (passo della griglia delle serie ricampionate)
+MINUTE_NS = 60 * 1_000_000_000
+
+# Dimensione dei blocchi letti da PyArrow
+CSV_BLOCK_SIZE = 1 << 20
+
+# Numero di righe del CSV convertite per blocco dal lettore pandas di riserva
+CSV_CHUNKSIZE = 200_000
+
+# Cache del DataFrame caricato, invalidata quando cambia il file CSV.
+# 'offset' è la posizione (in byte) della fine dell'ultima riga completa già letta
+_data_cache = {'key': None, 'df': None, 'offset': 0, 'fingerprint': None}
+
+# Con più thread per processo una sola richiesta alla volta aggiorna la cache (le altre la attendono)
+_load_lock = threading.Lock()
+
+# Funzione per leggere i byte del CSV a partire da offset, fino all'ultima riga completa.
+# Lettura normale e non mappata in memoria: se il file venisse troncato o riscritto durante
+# il parsing, l'accesso a una mappatura ucciderebbe il processo (SIGBUS). A ogni aggiornamento
+# si legge comunque solo la coda
+def read_csv_bytes(offset=0):
+    with open(CSV_PATH, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    
+    # Un'eventuale riga finale incompleta (scrittura in corso) verrà letta al prossimo giro.
+    # Vale anche per un file che termina senza a capo: l'ultima riga compare solo quando viene
+    # chiusa da '\n' (chi scrive il CSV deve terminare ogni riga)
+    end = data.rfind(b'\n') + 1
+    return pa.py_buffer(data).slice(0, end), offset + end
+
+# Funzione per convertire i tipi delle colonne di un blocco di righe del CSV
+def convert_columns(df):
+    # Colonne dei sensori mancanti nel file: vuote
+    df = df.reindex(columns=CSV_COLUMNS)
+    
+    # Converti colonne dei sensori a float (32 bit bastano per le letture dei sensori)
+    for sensor in SENSORS.keys():
+        df[sensor] = pd.to_numeric(df[sensor], errors='coerce').astype('float32')
+    
+    # Timestamp già convertiti in lettura; se qualche valore non è valido pandas lascia le stringhe:
+    # vengono convertiti qui, scartando le righe senza un timestamp valido. Il filtro viene per
+    # ultimo, così nessuna colonna viene assegnata su una selezione di righe
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+        df = df[df['timestamp'].notna()]
+    
+    return df
+
+# Funzione per leggere e tipizzare righe CSV con pandas, a blocchi (usata se PyArrow rifiuta il file)
+def read_csv_pandas(data, columns=None):
+    # Carica il CSV convertendo i timestamp (ISO 8601) già in fase di lettura
+    options = {'header': None, 'names': columns} if columns is not None else {}
+    reader = pd.read_csv(io.BytesIO(memoryview(data)), usecols=lambda column: column in CSV_COLUMNS,
+                         parse_dates=['timestamp'], date_format='ISO8601', cache_dates=True,
+                         chunksize=CSV_CHUNKSIZE, **options)
+    with reader:
+        chunks = [convert_columns(chunk) for chunk in reader]
+    
+    return pd.concat(chunks, ignore_index=True)
+
+# Funzione per leggere e tipizzare righe CSV: l'intero file con intestazione,
+# oppure solo le righe accodate (senza intestazione) se vengono passate le colonne.
+# PyArrow converte timestamp e sensori in un unico passaggio multithread, a blocchi,
+# saltando le colonne che la dashboard non usa
+def read_csv_data(data, columns=None):
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE, column_names=columns)
+    convert_options = pacsv.ConvertOptions(column_types=CSV_COLUMN_TYPES, null_values=['', 'NA', 'nan'],
+                                           strings_can_be_null=True, include_columns=CSV_COLUMNS,
+                                           include_missing_columns=True)
+    try:
+        with pacsv.open_csv(pa.BufferReader(data), read_options=read_options,
+                            convert_options=convert_options) as reader:
+            table = reader.read_all()
+    except pa.ArrowInvalid:
+        # Valori non convertibili (righe corrotte): pandas li trasforma in NaN invece di fallire
+        return read_csv_pandas(data, columns)
+    
+    # Righe con il timestamp vuoto: inutilizzabili, scartate come nel lettore pandas
+    if table['timestamp'].null_count:
+        table = table.filter(pc.is_valid(table['timestamp']))
+    
+    # Le colonne restano con dtype NumPy: campionamento e statistiche lavorano su array NumPy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+# Funzione per leggere le colonne dall'intestazione del CSV (servono per leggere le righe accodate).
+# L'intestazione passa dallo stesso parser della lettura completa, che gestisce BOM e virgolette
+def read_csv_header():
+    with open(CSV_PATH, 'rb') as f:
+        header = f.readline().rstrip(b'\r\n') + b'\n'
+    return pacsv.read_csv(pa.py_buffer(header)).column_names
+
+# Funzione per l'impronta dei primi byte del CSV (intestazione e prime righe):
+# distingue un file solo accodato da uno sostituito
+def csv_fingerprint(offset):
+    with open(CSV_PATH, 'rb') as f:
+        head = f.read(min(offset, FINGERPRINT_SIZE))
+    return hashlib.blake2b(head, digest_size=8).hexdigest()
+
+# Funzione per leggere la copia Feather, se deriva dallo stesso CSV (anche se poi accodato).
+# Restituisce il DataFrame e l'offset del CSV fino a cui arriva
+def read_feather_data(size):
+    try:
+        # Il file non è compresso: la lettura mappa direttamente i buffer Arrow senza copiarli
+        table = feather.read_table(FEATHER_PATH, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    # Copia scritta con altre colonne (versione precedente della dashboard): va rigenerata
+    if table.column_names != CSV_COLUMNS:
+        return None
+    metadata = table.schema.metadata or {}
     try:
-        # Carica il CSV
-        df = pd.read_csv(CSV_PATH)
+        offset = int(metadata[b'csv_offset'])
+        fingerprint = metadata[b'csv_fingerprint'].decode()
+    except (KeyError, ValueError):
+        return None
+    if offset > size or csv_fingerprint(offset) != fingerprint:
+        return None
+    return table.to_pandas(), offset
+
+# Funzione per salvare la copia Feather insieme all'offset (e all'impronta) del CSV da cui deriva
+def write_feather_data(df, offset, fingerprint):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'csv_offset': str(offset).encode(),
+        b'csv_fingerprint': fingerprint.encode()
+    })
+    # Scrive su un file temporaneo (con nome unico, anche tra processi diversi) e poi lo sostituisce,
+    # per non alterare una copia ancora mappata
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(FEATHER_PATH), suffix='.feather.tmp')
+        os.close(fd)
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, FEATHER_PATH)
+    except OSError as e:
+        app.logger.warning("Impossibile salvare la copia Feather: %s", e)
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+# Stato della copia Feather in questo processo: file di lock (aperto se il processo ne è il
+# proprietario), offset del CSV fino a cui arriva la copia e momento dell'ultima scrittura
+_feather_state = {'lock': None, 'offset': None, 'written': None}
+
+# Funzione per stabilire se questo processo è quello che scrive la copia Feather: con più worker
+# gunicorn è uno solo, chi ottiene il lock esclusivo sul file .lock (lo tiene finché resta attivo)
+def owns_feather():
+    if _feather_state['lock'] is not None or fcntl is None:
+        return True
+    try:
+        lock = open(FEATHER_PATH + '.lock', 'a')
+    except OSError:
+        return False
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    _feather_state['lock'] = lock
+    return True
+
+# Funzione per aggiornare la copia Feather, chiamata dal thread di controllo del CSV. Riscriverla
+# a ogni riga accodata costerebbe O(N) ogni volta: viene scritta al più ogni FEATHER_WRITE_INTERVAL
+# secondi, e all'avvio la parte mancante viene comunque letta dalla coda del CSV
+def save_feather_data():
+    with _load_lock:
+        df, offset, fingerprint = _data_cache['df'], _data_cache['offset'], _data_cache['fingerprint']
+    if df is None or offset == _feather_state['offset']:
+        return
+    written = _feather_state['written']
+    if written is not None and time.monotonic() - written < FEATHER_WRITE_INTERVAL:
+        return
+    if not owns_feather():
+        return
+    
+    write_feather_data(df, offset, fingerprint)
+    _feather_state['offset'] = offset
+    _feather_state['written'] = time.monotonic()
+
+# Funzione per ordinare le righe per timestamp, solo se serve: il CSV è scritto in ordine,
+# quindi di norma basta un controllo in un solo passaggio invece dell'ordinamento
+def sort_by_timestamp(df):
+    if df['timestamp'].is_monotonic_increasing:
+        return df
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+# Funzione per caricare i dati, riusando la copia in memoria o quella Feather se il CSV non è cambiato.
+# Il CSV viene solo accodato: se è cresciuto, vengono lette soltanto le righe nuove
+def load_data():
+    with _load_lock:
+        stat = os.stat(CSV_PATH)
+        key = f"{stat.st_mtime_ns}:{stat.st_size}"
+        if _data_cache['key'] == key:
+            return _data_cache['df']
         
-        # Converti timestamp in datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        cached, offset, fingerprint = _data_cache['df'], _data_cache['offset'], _data_cache['fingerprint']
+        if cached is None:
+            # All'avvio riparte dalla copia Feather, anche se nel frattempo il CSV è cresciuto
+            loaded = read_feather_data(stat.st_size)
+            if loaded is not None:
+                cached, offset = loaded
+                fingerprint = csv_fingerprint(offset)
+                _feather_state['offset'] = offset
         
-        # Converti colonne dei sensori a float
-        for sensor in SENSORS.keys():
-            if sensor in df.columns:
-                df[sensor] = pd.to_numeric(df[sensor], errors='coerce')
+        # La coda si legge solo se l'inizio del file è ancora quello già letto: un file sostituito
+        # da uno almeno altrettanto lungo verrebbe altrimenti letto da un offset senza senso
+        if cached is not None and stat.st_size >= offset and csv_fingerprint(offset) == fingerprint:
+            # Legge solo la coda del file
+            data, offset = read_csv_bytes(offset)
+            if data:
+                new_rows = sort_by_timestamp(read_csv_data(data, columns=read_csv_header()))
+                df = pd.concat([cached, new_rows], ignore_index=True)
+                # Basta controllare la giunzione: le due parti sono già ordinate
+                if not (cached.empty or new_rows.empty) and \
+                        new_rows['timestamp'].iloc[0] < cached['timestamp'].iloc[-1]:
+                    df = sort_by_timestamp(df)
+            else:
+                df = cached
+        else:
+            # Nessuna copia utilizzabile, oppure file sostituito o troncato: lettura completa
+            data, offset = read_csv_bytes()
+            df = sort_by_timestamp(read_csv_data(data))
         
-        # Ordina per timestamp
-        df = df.sort_values('timestamp')
+        _data_cache['key'] = key
+        _data_cache['df'] = df
+        _data_cache['offset'] = offset
+        _data_cache['fingerprint'] = csv_fingerprint(offset)
+        return df
+
+# Funzione per il campionamento LTTB (Largest-Triangle-Three-Buckets):
+# restituisce gli indici di n_out punti che conservano la forma della serie (picchi e valli).
+# LTTB esatto solo con tsdownsample installato; altrimenti si usa l'approssimazione NumPy
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    if LTTBDownsampler is not None:
+        return LTTBDownsampler().downsample(x, y, n_out=n_out).astype(np.int64)
+    return approx_lttb_indices(x, y, n_out)
+
+# Funzione per un'approssimazione di LTTB in NumPy, senza dipendenze aggiuntive. NON è LTTB:
+# il vertice sinistro del triangolo è la media del bucket precedente invece del punto scelto
+# in quel bucket, quindi i punti scelti possono differire da quelli di LTTB (la forma della
+# serie, picchi e valli compresi, resta comunque riconoscibile)
+def approx_lttb_indices(x, y, n_out):
+    n = len(y)
+    x = (x - x[0]).astype(np.float64)
+    y = y.astype(np.float64)
+    
+    # Primo e ultimo punto sono sempre inclusi, gli altri sono divisi in n_out - 2 bucket
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    
+    # Medie di tutti i bucket calcolate in un colpo solo (primo e ultimo punto fanno da bucket a sé)
+    bounds = np.concatenate(([0], edges, [n]))
+    counts = np.diff(bounds)
+    avg_x = np.add.reduceat(x, bounds[:-1]) / counts
+    avg_y = np.add.reduceat(y, bounds[:-1]) / counts
+    
+    # Per ogni punto interno, area del triangolo con la media del bucket precedente e di quello
+    # successivo: usando la media al posto del punto scelto prima (l'approssimazione), i bucket
+    # sono indipendenti e il calcolo non richiede un ciclo Python
+    bucket = np.repeat(np.arange(1, n_out - 1), counts[1:-1])
+    ax, ay = avg_x[bucket - 1], avg_y[bucket - 1]
+    bx, by = avg_x[bucket + 1], avg_y[bucket + 1]
+    areas = np.abs((ax - bx) * (y[1:n - 1] - ay) - (ax - x[1:n - 1]) * (by - ay))
+    
+    # Primo punto di area massima in ogni bucket
+    best = np.maximum.reduceat(areas, edges[:-1] - 1)
+    is_best = areas == best[bucket - 1]
+    _, first = np.unique(bucket[is_best], return_index=True)
+    
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[1:-1] = np.flatnonzero(is_best)[first] + 1
+    indices[-1] = n - 1
+    return indices
+
+# Funzione per ricampionare a 1 minuto le letture di ogni sensore, con NumPy: medie per minuto
+# e interpolazione lineare dei minuti senza letture, dal primo all'ultimo minuto con dati.
+# Gira a ogni aggiornamento del CSV, e con pandas resample/interpolate costava il doppio
+def resample_series(df):
+    # Minuto di ogni lettura (i dati sono già ordinati per timestamp, quelli mancanti sono esclusi)
+    timestamps = df['timestamp'].to_numpy()
+    known = ~np.isnat(timestamps)
+    minutes = timestamps[known].astype('datetime64[ns]').view(np.int64) // MINUTE_NS
+    if not minutes.size:
+        empty = (np.array([], dtype='datetime64[ns]'), np.array([], dtype=np.float32))
+        return {sensor: empty for sensor in SENSORS.keys()}
+    
+    # Griglia a 1 minuto dalla prima all'ultima lettura, condivisa: ogni serie ne usa una vista
+    cells = minutes - minutes[0]
+    grid = ((minutes[0] + np.arange(cells[-1] + 1)) * MINUTE_NS).view('datetime64[ns]')
+    
+    series = {}
+    for sensor in SENSORS.keys():
+        values = df[sensor].to_numpy()[known]
+        valid = np.isfinite(values)
+        if not valid.any():
+            series[sensor] = (grid[:0], np.array([], dtype=np.float32))
+            continue
+        
+        # Media per minuto: somme e conteggi per cella della griglia, in un solo passaggio
+        sums = np.bincount(cells[valid], weights=values[valid])
+        counts = np.bincount(cells[valid])
+        filled = np.flatnonzero(counts)
+        means = sums[filled] / counts[filled]
+        
+        # Minuti senza letture interpolati (se ce ne sono)
+        first, last = filled[0], filled[-1] + 1
+        if filled.size < last - first:
+            means = np.interp(np.arange(first, last), filled, means)
+        series[sensor] = (grid[first:last], means.astype(np.float32))
+    
+    return series
+
+# Cache delle serie per sensore, per intervallo di date (None: tutti i dati),
+# svuotata quando cambia il DataFrame caricato
+_series_cache = {'source': None, 'series': OrderedDict()}
+_series_lock = threading.Lock()
+
+# Funzione per preparare una volta sola, per ogni sensore e intervallo, la serie ricampionata
+# a 1 minuto come coppia di array NumPy (timestamp, valori). Si ricampionano solo le letture
+# dell'intervallo: l'interpolazione non deve inventare valori dove nell'intervallo non ci sono letture
+def load_sensor_series(df, bounds=None):
+    with _series_lock:
+        if _series_cache['source'] is not df:
+            _series_cache['source'] = df
+            _series_cache['series'] = OrderedDict()
+        
+        cached = _series_cache['series']
+        if bounds in cached:
+            cached.move_to_end(bounds)
+            return cached[bounds]
         
-        # Filtra per date se specificato
-        if start_date and end_date:
-            start_date = pd.to_datetime(start_date)
-            end_date = pd.to_datetime(end_date) + timedelta(days=1) - timedelta(seconds=1)
-            df = df[(df['timestamp'] >= start_date) & (df['timestamp'] <= end_date)]
+        rows = df if bounds is None else df.iloc[range_slice(df['timestamp'].to_numpy(), bounds)]
+        series = resample_series(rows)
+        
+        cached[bounds] = series
+        if len(cached) > SERIES_CACHE_SIZE:
+            cached.popitem(last=False)
+        return series
+
+# Funzione per calcolare gli estremi dell'intervallo di date richiesto (giorno finale incluso)
+def date_bounds(start_date, end_date):
+    if not (start_date and end_date):
+        return None
+    start = pd.to_datetime(start_date)
+    end = pd.to_datetime(end_date) + timedelta(days=1) - timedelta(seconds=1)
+    return start.to_datetime64(), end.to_datetime64()
+
+# Funzione per selezionare i timestamp che cadono nell'intervallo. I timestamp sono ordinati:
+# bastano due ricerche binarie, e lo slice restituito dà viste degli array invece di copie
+def range_slice(timestamps, bounds):
+    lo = np.searchsorted(timestamps, bounds[0], side='left')
+    hi = np.searchsorted(timestamps, bounds[1], side='right')
+    return slice(lo, hi)
+
+# Funzione per l'ETag dei dati di un intervallo: cambia solo quando cambia il CSV.
+# Va calcolato prima di leggere i dati, così in caso di scrittura concorrente è al più "vecchio"
+def data_etag(start_date, end_date, sensor=None):
+    try:
+        stat = os.stat(CSV_PATH)
+    except OSError:
+        return None
+    version = f"{stat.st_mtime_ns}:{stat.st_size}|{start_date}|{end_date}|{sensor}"
+    return hashlib.blake2b(version.encode(), digest_size=8).hexdigest()
+
+# Funzione per le statistiche di una serie già ripulita dai valori mancanti (in resample_series):
+# niente filtri o copie, solo le riduzioni sull'array. Serie vuota: tutto a zero
+def sensor_stats(values):
+    if not values.size:
+        return {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'current': 0.0}
+    return {
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(values.mean(dtype=np.float64)),
+        'current': float(values[-1])
+    }
+
+# Risposte già pronte (JSON di /api/data e pagine renderizzate), indicizzate per ETag
+# (versione del CSV + intervallo): servono a più client che chiedono gli stessi dati.
+# Quando il CSV cambia cambiano le chiavi, e le risposte vecchie escono dalla cache per prime
+_payload_cache = OrderedDict()
+_payload_lock = threading.Lock()
+
+# Funzione per leggere una risposta dalla cache (None se non c'è)
+def cached_body(key):
+    with _payload_lock:
+        body = _payload_cache.get(key)
+        if body is not None:
+            _payload_cache.move_to_end(key)
+        return body
+
+# Funzione per memorizzare una risposta, scartando la meno usata di recente
+def store_body(key, body):
+    with _payload_lock:
+        _payload_cache[key] = body
+        _payload_cache.move_to_end(key)
+        if len(_payload_cache) > PAYLOAD_CACHE_SIZE:
+            _payload_cache.popitem(last=False)
+
+# Funzione per aggiornare in anticipo dati e serie, così le richieste li trovano già pronti
+def refresh_cache():
+    try:
+        load_sensor_series(load_data())
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        app.logger.warning("Aggiornamento in background dei dati non riuscito: %s", e)
+
+# Funzione per avviare il thread che rilegge il CSV quando cambia (uno per processo) e tiene
+# aggiornata la copia Feather. Le richieste chiamano comunque load_data, ma di norma trovano
+# la cache già aggiornata
+def start_watcher():
+    def watch():
+        while True:
+            # Un errore imprevisto non deve fermare il thread: il controllo riprende al giro dopo
+            try:
+                refresh_cache()
+                save_feather_data()
+            except Exception as e:
+                app.logger.warning("Controllo in background del CSV non riuscito: %s", e)
+            time.sleep(WATCH_INTERVAL)
+    
+    threading.Thread(target=watch, name='csv-watcher', daemon=True).start()
+
+# Funzione per caricare e processare i dati
+def process_data(start_date=None, end_date=None, chart_sensor=None):
+    # Usa direttamente la variabile globale
+    enable_sampling = ENABLE_SAMPLING
+    try:
+        # Carica i dati (dalla cache se il CSV non è cambiato)
+        df = load_data()
+        
+        # Serie dei sensori ricampionate dalle sole letture dell'intervallo richiesto
+        bounds = date_bounds(start_date, end_date)
+        series = load_sensor_series(df, bounds)
         
         # Calcola le statistiche per ogni sensore
         stats = {}
         chart_data = {}
         
-        for sensor in SENSORS.keys():
-            if sensor in df.columns:
-                sensor_df = df.dropna(subset=[sensor]).copy()
-                
-                if not sensor_df.empty:
-                    # Campionamento e interpolazione
-                    sensor_df = sensor_df.set_index('timestamp').sort_index()
-                    
-                    # Ricampiona a 1 minuto e interpola linearmente
-                    sensor_df = sensor_df.resample('min').mean(numeric_only=True)
-                    sensor_df[sensor] = pd.to_numeric(sensor_df[sensor], errors='coerce').interpolate(method='linear')
-                    
-                    # Ricostruisce il dataframe
-                    sensor_df = sensor_df.reset_index()
-                    sensor_df = sensor_df.dropna(subset=[sensor])
-                    
-                    # Controlla se il dataframe è vuoto dopo l'interpolazione
-                    if sensor_df.empty:
-                        stats[sensor] = {'min': 0, 'max': 0, 'mean': 0}
-                        continue
-                    
-                    # Campiona se necessario e se il campionamento è abilitato
-                    if enable_sampling and len(sensor_df) > MAX_POINTS:
-                        indices = np.linspace(0, len(sensor_df) - 1, MAX_POINTS).astype(int)
-                        sensor_df = sensor_df.iloc[indices]
-                    
-                    # Prepara dati per il grafico
-                    chart_data[sensor] = {
-                        'timestamps': sensor_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-                        'values': sensor_df[sensor].tolist()
-                    }
-                    
-                    # Calcola statistiche
-                    stats[sensor] = {
-                        'min': float(sensor_df[sensor].min()),
-                        'max': float(sensor_df[sensor].max()),
-                        'mean': float(sensor_df[sensor].mean()),
-                        'current': float(sensor_df[sensor].iloc[-1])
-                    }
-                else:
-                    stats[sensor] = {'min': 0, 'max': 0, 'mean': 0}
+        for sensor, (timestamps, values) in series.items():
+            # Calcola statistiche (sull'intera serie, prima del campionamento)
+            stats[sensor] = sensor_stats(values)
+            
+            # Dati del grafico solo per il sensore richiesto (tutti se non specificato),
+            # le statistiche servono invece sempre per tutti. Nessuna lettura: nessun grafico
+            if not values.size or (chart_sensor and sensor != chart_sensor):
+                continue
+            
+            # Campiona se necessario e se il campionamento è abilitato
+            if enable_sampling and len(values) > MAX_POINTS:
+                indices = lttb_indices(timestamps.astype(np.int64), values, MAX_POINTS)
+                timestamps = timestamps[indices]
+                values = values[indices]
+            
+            # Prepara dati per il grafico
+            chart_data[sensor] = {
+                # Millisecondi, convertiti in date dal browser: nessuna formattazione di stringhe.
+                # Restano array NumPy, serializzati da orjson direttamente dai loro buffer
+                'timestamps': timestamps.astype('datetime64[ms]').astype(np.int64),
+                # Valori come byte float32 (little endian) in base64, letti dal browser come Float32Array
+                'values': base64.b64encode(values.astype('<f4', copy=False).tobytes()).decode('ascii')
+            }
         
-        last_update = df['timestamp'].max() if not df.empty else None
+        # Ultimo timestamp nell'intervallo (la colonna è ordinata: è l'ultimo della selezione)
+        timestamps = df['timestamp']
+        if bounds:
+            timestamps = timestamps.iloc[range_slice(timestamps.to_numpy(), bounds)]
+        last_update = timestamps.iloc[-1] if not timestamps.empty else None
+        if pd.isna(last_update):
+            last_update = None
         
         return {
             'stats': stats,
@@ -103,7 +591,7 @@ def process_data(start_date=None, end_date=None):
             'last_update': last_update
         }
     except Exception as e:
-        print(f"Errore nel caricamento o elaborazione dei dati: {e}")
+        app.logger.error("Errore nel caricamento o elaborazione dei dati: %s", e)
         return {
             'stats': {},
             'chart_data': {},
@@ -111,6 +599,51 @@ def process_data(start_date=None, end_date=None):
             'error': str(e)
         }
 
+# Funzione per le date predefinite di un giorno (e il loro JSON per la pagina)
+@lru_cache(maxsize=1)
+def default_date_ranges(ordinal):
+    today = date.fromordinal(ordinal)
+    date_ranges = {
+        'today': today.isoformat(),
+        'week': (today - timedelta(days=7)).isoformat(),
+        'month': (today - timedelta(days=30)).isoformat()
+    }
+    return date_ranges, template_json(date_ranges)
+
+# Funzione per riconoscere un ETag già in possesso del client, sia nella forma della risposta
+# non compressa sia in quella gzip. Restituisce la forma trovata (o None)
+def matching_etag(etag):
+    for candidate in (etag, etag + GZIP_ETAG_SUFFIX):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+# Funzione per le intestazioni di cache comuni a pagine e JSON: le copie vanno sempre
+# riconvalidate (niente freschezza euristica), e il corpo dipende dalla compressione accettata
+def set_cache_headers(response):
+    response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+
+# Funzione per la risposta 304, con le stesse intestazioni di cache della risposta completa
+def not_modified(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    set_cache_headers(response)
+    return response
+
+# Funzione per la risposta con una pagina cacheable: ETag e data di modifica (del CSV, o inizio
+# della giornata se più recente, perché da allora cambiano le date predefinite)
+def page_response(page, page_etag):
+    response = app.response_class(page, mimetype='text/html')
+    response.set_etag(page_etag)
+    set_cache_headers(response)
+    try:
+        modified = datetime.fromtimestamp(os.path.getmtime(CSV_PATH))
+    except OSError:
+        return response
+    response.last_modified = max(modified, datetime.combine(date.today(), datetime.min.time())).astimezone()
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     # Ottieni i parametri di data se presenti
@@ -118,404 +651,127 @@ def index():
     end_date = request.args.get('end_date')
     focused_sensor = request.args.get('focus', '')
     
-    # Calcola le date predefinite
-    today = datetime.now().date()
-    date_ranges = {
-        'today': today.isoformat(),
-        'week': (today - timedelta(days=7)).isoformat(),
-        'month': (today - timedelta(days=30)).isoformat()
-    }
+    # Date predefinite (ricalcolate solo quando cambia il giorno)
+    date_ranges, date_ranges_json = default_date_ranges(date.today().toordinal())
+    
+    # Processa i dati (in modalità focus serve il grafico di un solo sensore)
+    chart_sensor = focused_sensor if focused_sensor in SENSORS else None
+    etag = data_etag(start_date, end_date, chart_sensor)
     
-    # Processa i dati
-    data = process_data(start_date, end_date)
+    # Stessa versione del CSV, stessi parametri e stesso giorno: la pagina è identica
+    cache_key = ('page', etag, focused_sensor, date_ranges['today'])
+    page_etag = hashlib.blake2b(repr(cache_key).encode(), digest_size=8).hexdigest() if etag else None
+    
+    # Il browser ha già questa pagina (ricaricata o riaperta): nessuna elaborazione
+    matched = matching_etag(page_etag) if page_etag else None
+    if matched:
+        return not_modified(matched)
+    
+    page = cached_body(cache_key) if etag else None
+    if page is not None:
+        return page_response(page, page_etag)
+    
+    data = process_data(start_date, end_date, chart_sensor)
     
     # Renderizza il template
-    return render_template('index.html', 
+    page = render_template('index.html', 
                           sensors=SENSORS,
                           stats=data['stats'],
                           chart_data=data['chart_data'],
                           data_available=data['data_available'],
                           error=data.get('error', None),
-                          date_ranges=date_ranges,
+                          sensors_json=SENSORS_JSON,
+                          date_ranges_json=date_ranges_json,
                           start_date=start_date or date_ranges['today'],
                           end_date=end_date or date_ranges['today'],
                           focused_sensor=focused_sensor,
-                          last_update=data.get('last_update'))
+                          last_update=data.get('last_update'),
+                          data_etag=etag)
+    
+    # Le pagine di errore non vengono memorizzate: l'errore potrebbe essere temporaneo
+    if not (etag and data['data_available']):
+        return page
+    store_body(cache_key, page)
+    return page_response(page, page_etag)
 
-if __name__ == '__main__':
-    # Crea la directory templates se non esiste
-    os.makedirs('templates', exist_ok=True)
-    
-    # Crea il template HTML
-    with open('templates/index.html', 'w') as f:
-        f.write("""<!DOCTYPE html>
-<html lang="it">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="refresh" content="60">
-    <title>Irrigo Dashboard</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap-icons@1.7.2/font/bootstrap-icons.css">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        .chart-container {
-            position: relative;
-            height: 250px;
-            width: 100%;
-            margin-bottom: 20px;
-        }
-        .focus-container {
-            position: relative;
-            height: 400px;
-            width: 100%;
-        }
-        .data-error {
-            padding: 2rem;
-            text-align: center;
-        }
-        body {
-            padding-bottom: 2rem;
-        }
-        .form-switch .form-check-input {
-            width: 3em;
-            margin-left: 0;
-            margin-right: 10px;
-        }
-    </style>
-</head>
-<body>
-    <div class="container-fluid p-4">
-        <h1 class="text-center mb-4">Irrigo Dashboard</h1>
-        
-        {% if data_available %}
-            <!-- Debug info -->
-            <div class="alert alert-info mb-3">
-                <div class="row">
-                    {% for sensor, sensor_stats in stats.items() %}
-                    <div class="col-md-3 mb-2">
-                        <div class="row align-items-center">
-                            <div class="col-6">
-                                <h4 class="mb-0">{{ "%.2f"|format(sensor_stats.current) }} <small>{{ sensors[sensor].unit }}</small></h4>
-                                <small class="text-muted">{{ sensors[sensor].name }}</small>
-                            </div>
-                            <div class="col-6">
-                                <div class="text-muted" style="font-size:0.8em">
-                                    Min: {{ "%.2f"|format(sensor_stats.min) }} {{ sensors[sensor].unit }}<br>
-                                    Max: {{ "%.2f"|format(sensor_stats.max) }} {{ sensors[sensor].unit }}<br>
-                                    Media: {{ "%.2f"|format(sensor_stats.mean) }} {{ sensors[sensor].unit }}
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    {% endfor %}
-                </div>
-                <div class="mt-2 text-muted">
-                    Ultimo aggiornamento: 
-                    {% if last_update %}
-                        {{ last_update.strftime('%Y-%m-%d %H:%M:%S') }}
-                    {% else %}
-                        Nessun dato disponibile
-                    {% endif %}
-                </div>
-            </div>
-            
-            <!-- Controlli -->
-            <form class="row mb-4" method="get" action="/">
-                <div class="col-md-6">
-                    <label class="form-label">Seleziona intervallo temporale:</label>
-                    <div class="d-flex flex-wrap">
-                        <input type="date" name="start_date" id="start-date" class="form-control me-2 mb-2" style="max-width: 200px;" value="{{ start_date }}">
-                        <input type="date" name="end_date" id="end-date" class="form-control me-2 mb-2" style="max-width: 200px;" value="{{ end_date }}">
-                        <input type="hidden" name="focus" id="focus-input" value="{{ focused_sensor }}">
-                        <button type="submit" class="btn btn-primary me-2 mb-2">Filtra</button>
-                        <button type="button" id="btn-home" class="btn btn-outline-primary me-2 mb-2">
-                            <i class="bi bi-house-door"></i>
-                        </button>
-                        <button type="button" id="btn-today" class="btn btn-outline-primary me-2 mb-2">Oggi</button>
-                        <button type="button" id="btn-week" class="btn btn-outline-primary me-2 mb-2">Ultima settimana</button>
-                        <button type="button" id="btn-month" class="btn btn-outline-primary mb-2">Ultimo mese</button>
-                    </div>
-                </div>
-                <div class="col-md-6">
-                    <label class="form-label">Focus su sensore:</label>
-                    <select id="sensor-focus" class="form-select mb-2" style="max-width: 300px;">
-                        <option value="">Tutti i sensori</option>
-                        {% for id, sensor_info in sensors.items() %}
-                            <option value="{{ id }}" {% if id == focused_sensor %}selected{% endif %}>{{ sensor_info.name }} ({{ sensor_info.unit }})</option>
-                        {% endfor %}
-                    </select>
-                </div>
-            </form>
-            
-            {% if focused_sensor and focused_sensor in sensors %}
-                <!-- Grafico in focus -->
-                <div class="mt-4">
-                    <h3 class="mb-3">Focus su: {{ sensors[focused_sensor].name }} ({{ sensors[focused_sensor].unit }})</h3>
-                    <div class="focus-container" id="chart-focus"></div>
-                    <button id="btn-close-focus" class="btn btn-outline-secondary mt-2">Chiudi focus</button>
-                </div>
-            {% else %}
-                <!-- Contenitore per i grafici -->
-                <div class="row" id="graphs-container">
-                    {% for sensor_id, sensor_name in sensors.items() %}
-                        {% if sensor_id in chart_data %}
-                            <div class="col-md-6 mb-4">
-                                <div class="chart-container" id="chart-{{ sensor_id }}"></div>
-                            </div>
-                        {% endif %}
-                    {% endfor %}
-                </div>
-            {% endif %}
-            
-        {% else %}
-            <div class="alert alert-danger data-error">
-                <h3>Errore durante il caricamento dei dati</h3>
-                {% if error %}
-                    <p>{{ error }}</p>
-                {% else %}
-                    <p>Nessun dato disponibile.</p>
-                {% endif %}
-            </div>
-        {% endif %}
-    </div>
-
-    <script src="https://cdn.jsdelivr.net/npm/moment@2.29.4/min/moment.min.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/moment@2.29.4/locale/it.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/chartjs-adapter-moment@1.0.1/dist/chartjs-adapter-moment.min.js"></script>
-    <script>
-        const sensors = {{ sensors|tojson }};
-        const chartData = {{ chart_data|tojson }};
-        const dateRanges = {{ date_ranges|tojson }};
-        const focusedSensor = "{{ focused_sensor }}";
-        let charts = {};
-        
-        // Funzione per creare un grafico
-        function createChart(containerId, sensorId, sensorName, isFocus = false) {
-            const unit = sensors[sensorId].unit || '';
-            const container = document.getElementById(containerId);
-            if (!container) return;
-            
-            const data = chartData[sensorId];
-            if (!data || data.timestamps.length === 0) {
-                container.innerHTML = `<div class="alert alert-warning">Nessun dato valido per ${sensorName}</div>`;
-                return;
-            }
-            
-            // Crea canvas se non esiste
-            let canvas = container.querySelector('canvas');
-            if (!canvas) {
-                canvas = document.createElement('canvas');
-                container.innerHTML = '';
-                container.appendChild(canvas);
-            }
-            
-            // Crea configurazione grafico
-            const chartConfig = {
-                type: 'line',
-                data: {
-                    datasets: [{
-                        label: sensorName,
-                        data: data.timestamps.map((t, i) => ({
-                            x: t, // Usa direttamente la stringa timestamp
-                            y: data.values[i]
-                        })),
-                        borderColor: '#17a2b8',
-                        borderWidth: 2,
-                        pointRadius: isFocus ? 2 : 0,
-                        pointHoverRadius: 5,
-                        tension: 0.1,
-                        fill: false
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    animation: {
-                        duration: 0 // Disabilita animazioni per performance
-                    },
-                    plugins: {
-                        title: {
-                            display: true,
-                            text: sensorName + ' (' + unit + ')',
-                            font: {
-                                size: 16
-                            }
-                        },
-                        tooltip: {
-                            mode: 'index',
-                            intersect: false
-                        },
-                        legend: {
-                            display: false
-                        }
-                    },
-                    scales: {
-                        x: {
-                            type: 'time',
-                            time: {
-                                parser: 'YYYY-MM-DD HH:mm:ss',
-                                unit: (ctx) => {
-                                    const data = ctx.chart.data.datasets[0].data;
-                                    if (!data.length) return 'hour';
-                                    
-                                    const first = new Date(data[0].x);
-                                    const last = new Date(data[data.length-1].x);
-                                    const diffDays = (last - first) / (1000 * 3600 * 24);
-                                    
-                                    return diffDays >= 2 ? 'day' : 'hour';
-                                },
-                                displayFormats: {
-                                    hour: 'HH:mm',
-                                    day: 'DD/MM HH:mm'
-                                },
-                                tooltipFormat: 'dddd D MMMM YYYY [ore] HH:mm'
-                            },
-                            adapters: {
-                                date: {
-                                    locale: 'it' // Imposta la localizzazione italiana
-                                }
-                            },
-                            ticks: {
-                                source: 'data', // Prende i tick direttamente dai dati
-                                maxRotation: 35,
-                                minRotation: 35,
-                                font: {
-                                    size: 10
-                                },
-                                padding: 5,
-                                maxTicksLimit: isFocus ? 8 : 5,
-                                autoSkip: true
-                            },
-                            grid: {
-                                display: true,
-                                color: 'rgba(0, 0, 0, 0.1)',  // Colore più tenue
-                                borderDash: [5, 5],           // Tratteggio 5px on/5px off
-                                drawTicks: false              // Non disegnare ticks sulla griglia
-                            },
-                            title: {
-                                display: true,
-                                text: ctx => {
-                                    const data = ctx.scale.chart.data.datasets[0].data;
-                                    if (!data.length) return 'Data/Ora';
-                                    
-                                    const first = new Date(data[0].x);
-                                    const last = new Date(data[data.length-1].x);
-                                    
-                                    if (first.toDateString() === last.toDateString()) {
-                                        return 'Ora - ' + first.toLocaleDateString('it-IT');
-                                    }
-                                    return 'Data/Ora';
-                                }
-                            }
-                        },
-                        y: {
-                            title: {
-                                display: true,
-                                text: sensorName + ' (' + unit + ')'
-                            },
-                            beginAtZero: false,
-                            ticks: {
-                                font: {
-                                    size: 10
-                                },
-                                padding: 5
-                            },
-                            grid: {
-                                color: 'rgba(0, 0, 0, 0.05)', // Griglia più tenue per l'asse Y
-                                borderDash: [3, 3]            // Tratteggio più sottile
-                            }
-                        }
-                    }
-                }
-            };
-            
-            // Diagnostica temporanea
-            console.log('Dati per', sensorId, ':', {
-                timestamps: data.timestamps,
-                values: data.values
-            });
-            
-            // Crea il grafico
-            const chart = new Chart(canvas, chartConfig);
-            charts[containerId] = chart;
-            
-            // Log del grafico creato
-            console.log('Grafico creato in', containerId, ':', chart);
-        }
-        
-        // Configurazione date picker
-        function setupDatePickers() {
-            document.getElementById('btn-home').addEventListener('click', (e) => {
-                e.preventDefault();
-                window.location.href = '/'; // Resetta tutti i filtri
-            });
-            
-            document.getElementById('btn-today').addEventListener('click', (e) => {
-                e.preventDefault();
-                document.getElementById('start-date').value = dateRanges.today;
-                document.getElementById('end-date').value = dateRanges.today;
-                document.querySelector('form').submit();
-            });
-            
-            document.getElementById('btn-week').addEventListener('click', (e) => {
-                e.preventDefault();
-                document.getElementById('start-date').value = dateRanges.week;
-                document.getElementById('end-date').value = dateRanges.today;
-                document.querySelector('form').submit();
-            });
-            
-            document.getElementById('btn-month').addEventListener('click', (e) => {
-                e.preventDefault();
-                document.getElementById('start-date').value = dateRanges.month;
-                document.getElementById('end-date').value = dateRanges.today;
-                document.querySelector('form').submit();
-            });
-        }
+@app.route('/api/data')
+def api_data():
+    # Stessi parametri della pagina, così il client aggiorna i grafici senza ricaricarla;
+    # con 'sensor' vengono restituiti i dati del grafico di quel solo sensore
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    sensor = request.args.get('sensor')
+    chart_sensor = sensor if sensor in SENSORS else None
+    
+    # Se il client ha già i dati di questa versione del CSV non serve rielaborarli
+    etag = data_etag(start_date, end_date, chart_sensor)
+    matched = matching_etag(etag) if etag else None
+    if matched:
+        return not_modified(matched)
+    
+    body = cached_body(('api', etag)) if etag else None
+    if body is None:
+        data = process_data(start_date, end_date, chart_sensor)
+        last_update = data.get('last_update')
         
-        // Funzione per gestire il focus selector
-        function setupFocusSelector() {
-            const focusSelector = document.getElementById('sensor-focus');
-            if (focusSelector) {
-                focusSelector.addEventListener('change', () => {
-                    document.getElementById('focus-input').value = focusSelector.value;
-                    document.querySelector('form').submit();
-                });
-            }
-            
-            const closeBtn = document.getElementById('btn-close-focus');
-            if (closeBtn) {
-                closeBtn.addEventListener('click', () => {
-                    document.getElementById('focus-input').value = '';
-                    document.querySelector('form').submit();
-                });
-            }
-        }
+        body = app.json.dumps({
+            'stats': data['stats'],
+            'chart_data': data['chart_data'],
+            'data_available': data['data_available'],
+            'error': data.get('error', None),
+            'last_update': last_update.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(last_update) else None
+        })
         
+        # Gli errori non vengono memorizzati: potrebbero essere temporanei
+        if not data['data_available']:
+            return app.response_class(body, mimetype='application/json')
         
-        // Inizializzazione all'avvio della pagina
-        document.addEventListener('DOMContentLoaded', () => {
-            if (focusedSensor && chartData[focusedSensor]) {
-                createChart('chart-focus', focusedSensor, sensors[focusedSensor].name, true);
-            } else {
-                for (const [sensorId, sensorInfo] of Object.entries(sensors)) {
-                    if (chartData[sensorId]) {
-                        createChart(`chart-${sensorId}`, sensorId, sensorInfo.name);
-                    }
-                }
-            }
-            
-            setupDatePickers();
-            setupFocusSelector();
-        });
-    </script>
-</body>
-</html>""")
-    
-    # Jinja2 filter per la data corrente
-    @app.template_filter('now')
-    def template_now(format='%Y-%m-%d\n%H:%M:%S'):
-        return datetime.now().strftime(format)
-    
-    # Avvio dell'applicazione con modalità debug disabilitata
-    app.run(debug=False, host='0.0.0.0', port=8050, threaded=False)
+        if etag:
+            store_body(('api', etag), body)
+    
+    response = app.response_class(body, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+        # Il client aggiorna i dati con If-None-Match: le copie in cache vanno sempre riconvalidate
+        set_cache_headers(response)
+    return response
+
+# Funzione per comprimere con gzip pagine e JSON, se il client lo accetta. Le risposte con ETag
+# sono identiche per la stessa versione dei dati: il corpo compresso resta nella cache delle risposte,
+# e riceve un ETag distinto da quello del corpo non compresso
+@app.after_request
+def compress_response(response):
+    if response.status_code != 200 or response.direct_passthrough or \
+            response.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings:
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    etag, weak = response.get_etag()
+    compressed = cached_body(('gzip', etag)) if etag else None
+    if compressed is None:
+        compressed = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+        if etag:
+            store_body(('gzip', etag), compressed)
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    if etag:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+    return response
+
+# Jinja2 filter per la data corrente
+@app.template_filter('now')
+def template_now(format='%Y-%m-%d\n%H:%M:%S'):
+    return datetime.now().strftime(format)
+
+if __name__ == '__main__':
+    start_watcher()
+    
+    # Avvio dell'applicazione con modalità debug disabilitata (in produzione: gunicorn, vedi gunicorn.conf.py)
+    app.run(debug=False, host='0.0.0.0', port=8050)
@@ -0,0 +1,19 @@
+import os
+
+# Configurazione di gunicorn per la dashboard: gunicorn -c gunicorn.conf.py wsgi:app
+bind = '0.0.0.0:8050'
+
+# Un processo per core, ognuno con più thread: le richieste concorrenti non si mettono in coda
+workers = os.cpu_count() or 1
+worker_class = 'gthread'
+threads = 4
+timeout = 30
+
+# L'app (e i dati) vengono caricati una volta nel processo principale prima del fork
+preload_app = True
+
+# I thread non sopravvivono al fork: ogni worker avvia il proprio controllo del CSV
+# (la copia Feather la scrive uno solo di loro, vedi owns_feather in app.py)
+def post_fork(server, worker):
+    from app import start_watcher
+    start_watcher()
@@ -0,0 +1,22 @@
+from collections import OrderedDict
+
+import pytest
+
+import app
+
+# CSV e copia Feather in una cartella temporanea, con tutte le cache vuote
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    path = tmp_path / 'telemetria.csv'
+    monkeypatch.setattr(app, 'CSV_PATH', str(path))
+    monkeypatch.setattr(app, 'FEATHER_PATH', str(tmp_path / 'telemetria.feather'))
+    monkeypatch.setattr(app, '_data_cache', {'key': None, 'df': None, 'offset': 0, 'fingerprint': None})
+    monkeypatch.setattr(app, '_feather_state', {'lock': None, 'offset': None, 'written': None})
+    monkeypatch.setattr(app, '_series_cache', {'source': None, 'series': OrderedDict()})
+    monkeypatch.setattr(app, '_payload_cache', OrderedDict())
+    monkeypatch.setattr(app, 'FEATHER_WRITE_INTERVAL', 0)
+    return path
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
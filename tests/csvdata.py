@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta
+
+import app
+
+HEADER = 'timestamp,pressure,pumpRunning,outputValveOpen,temperature,humidity,env_pressure\n'
+
+# Righe del CSV: una lettura ogni `step` minuti a partire da `start`, con pressione costante
+def csv_rows(start, count, pressure, step=5):
+    start = datetime.fromisoformat(start)
+    return ''.join(
+        f"{(start + timedelta(minutes=i * step)).isoformat()},{pressure},True,False,20.0,50.0,990.0\n"
+        for i in range(count)
+    )
+
+# Lettura completa del CSV, per confrontare i dati caricati in modo incrementale
+def full_read():
+    data, _ = app.read_csv_bytes()
+    return app.sort_by_timestamp(app.read_csv_data(data))
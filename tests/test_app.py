@@ -0,0 +1,32 @@
+import app
+from csvdata import HEADER, csv_rows
+
+def test_blank_timestamp_is_dropped(csv_path, client):
+    csv_path.write_text(
+        HEADER
+        + '2024-05-01T10:00:00,2.0,True,False,20,50,990\n'
+        + '2024-05-01T10:05:00,2.1,True,False,20,50,990\n'
+        + ',2.2,True,False,20,50,990\n'
+    )
+    
+    assert len(app.load_data()) == 2
+    
+    response = client.get('/?start_date=2024-05-01&end_date=2024-05-01')
+    assert response.status_code == 200
+    assert b'2024-05-01 10:05:00' in response.data
+    
+    response = client.get('/api/data?start_date=2024-05-01&end_date=2024-05-01')
+    assert response.status_code == 200
+    assert response.get_json()['last_update'] == '2024-05-01 10:05:00'
+
+def test_range_without_readings(csv_path, client):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 12, 1.0))
+    
+    response = client.get('/api/data?start_date=2024-05-02&end_date=2024-05-02')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['chart_data'] == {}
+    assert data['stats']['pressure'] == {'min': 0.0, 'max': 0.0, 'mean': 0.0, 'current': 0.0}
+    assert data['last_update'] is None
+    
+    assert client.get('/?start_date=2024-05-02&end_date=2024-05-02').status_code == 200
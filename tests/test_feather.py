@@ -0,0 +1,35 @@
+import app
+from csvdata import HEADER, csv_rows, full_read
+
+def test_replaced_file_ignores_feather_copy(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 10, 1.0))
+    app.load_data()
+    app.save_feather_data()
+    
+    # Ripartenza con un file diverso: la copia Feather non gli corrisponde
+    csv_path.write_text(HEADER + csv_rows('2024-06-01T00:00:00', 30, 2.0))
+    app._data_cache.update({'key': None, 'df': None, 'offset': 0, 'fingerprint': None})
+    assert app.load_data().equals(full_read())
+
+def test_feather_copy_is_completed_from_csv_tail(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 10, 1.0))
+    app.load_data()
+    app.save_feather_data()
+    
+    with open(csv_path, 'a') as f:
+        f.write(csv_rows('2024-05-01T01:00:00', 10, 2.0))
+    app._data_cache.update({'key': None, 'df': None, 'offset': 0, 'fingerprint': None})
+    df = app.load_data()
+    assert len(df) == 20
+    assert df.equals(full_read())
+
+def test_feather_copy_is_written_without_leftover_files(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 10, 1.0))
+    df = app.load_data()
+    app.save_feather_data()
+    
+    # Il file temporaneo (con nome unico) è stato rinominato nella copia definitiva
+    assert not list(csv_path.parent.glob('*.tmp'))
+    loaded, offset = app.read_feather_data(csv_path.stat().st_size)
+    assert loaded.equals(df)
+    assert offset == csv_path.stat().st_size
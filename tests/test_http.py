@@ -0,0 +1,39 @@
+import gzip
+
+from csvdata import HEADER, csv_rows
+
+def test_etag_and_gzip_variants(csv_path, client):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 200, 2.0))
+    url = '/api/data?start_date=2024-05-01&end_date=2024-05-01'
+    
+    plain = client.get(url)
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    
+    for response in (plain, compressed):
+        etag = response.headers['ETag']
+        again = client.get(url, headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+        assert again.status_code == 304
+        assert again.headers['ETag'] == etag
+
+def test_cache_headers_on_full_and_not_modified_responses(csv_path, client):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 200, 2.0))
+    
+    for url in ('/?start_date=2024-05-01&end_date=2024-05-01',
+                '/api/data?start_date=2024-05-01&end_date=2024-05-01'):
+        response = client.get(url)
+        again = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+        for r in (response, again):
+            assert r.headers['Cache-Control'] == 'no-cache'
+            assert 'Accept-Encoding' in r.headers['Vary']
+    
+    # Pagina non modificata secondo la data: stesse intestazioni
+    url = '/?start_date=2024-05-01&end_date=2024-05-01'
+    response = client.get(url)
+    again = client.get(url, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert again.status_code == 304
+    assert again.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in again.headers['Vary']
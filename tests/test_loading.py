@@ -0,0 +1,72 @@
+import warnings
+
+import pandas as pd
+
+import app
+from csvdata import HEADER, csv_rows, full_read
+
+def test_appended_rows_are_read_incrementally(csv_path):
+    rows = csv_rows('2024-05-01T00:00:00', 20, 2.0)
+    csv_path.write_text(HEADER + rows[:-10])  # ultima riga incompleta
+    assert len(app.load_data()) == 19
+    
+    with open(csv_path, 'a') as f:
+        f.write(rows[-10:])
+    df = app.load_data()
+    assert len(df) == 20
+    assert df.equals(full_read())
+
+def test_unterminated_last_line_is_read_once_terminated(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 3, 2.0).rstrip('\n'))
+    assert len(app.load_data()) == 2
+    
+    with open(csv_path, 'a') as f:
+        f.write('\n')
+    assert len(app.load_data()) == 3
+
+def test_replaced_file_is_read_again(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 10, 1.0))
+    app.load_data()
+    
+    # File diverso ma almeno altrettanto lungo: non va letto dall'offset precedente
+    csv_path.write_text(HEADER + csv_rows('2024-06-01T00:00:00', 30, 2.0))
+    df = app.load_data()
+    assert df.equals(full_read())
+    assert df['timestamp'].iloc[0] == pd.Timestamp('2024-06-01')
+
+def test_appended_rows_with_quoted_header(csv_path):
+    # Intestazione tra virgolette e con BOM UTF-8: le righe accodate usano gli stessi nomi
+    quoted = ','.join(f'"{name}"' for name in HEADER.strip().split(','))
+    csv_path.write_bytes(('\ufeff' + quoted + '\n' + csv_rows('2024-05-01T00:00:00', 10, 1.0)).encode())
+    assert len(app.load_data()) == 10
+    
+    with open(csv_path, 'a') as f:
+        f.write(csv_rows('2024-05-01T01:00:00', 10, 2.0))
+    df = app.load_data()
+    assert len(df) == 20
+    assert df.equals(full_read())
+
+def test_read_bytes_survive_truncation(csv_path):
+    csv_path.write_text(HEADER + csv_rows('2024-05-01T00:00:00', 10, 1.0))
+    data, offset = app.read_csv_bytes()
+    
+    # Il file troncato (o riscritto) durante il parsing non invalida i byte già letti
+    with open(csv_path, 'r+b') as f:
+        f.truncate(0)
+    assert len(app.read_csv_data(data)) == 10
+    assert offset == data.size
+
+def test_pandas_fallback_drops_invalid_timestamps(csv_path):
+    # Un valore non numerico fa fallire PyArrow: le righe passano dal lettore pandas
+    csv_path.write_text(
+        HEADER
+        + '2024-05-01T10:00:00,2.0,True,False,20,50,990\n'
+        + 'non valido,2.1,True,False,20,50,990\n'
+        + '2024-05-01T10:10:00,errore,True,False,20,50,990\n'
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        df = app.load_data()
+    assert len(df) == 2
+    assert df['pressure'].dtype == 'float32'
+    assert df['pressure'].isna().tolist() == [False, True]
@@ -0,0 +1,22 @@
+import app
+from csvdata import HEADER, csv_rows
+
+def test_range_does_not_interpolate_outside_readings(csv_path):
+    # Il 2 maggio non ha letture; il 3 iniziano alle 00:10: i minuti prima non vanno interpolati
+    # con le letture del 1 maggio
+    csv_path.write_text(
+        HEADER + csv_rows('2024-05-01T00:00:00', 12, 1.0) + csv_rows('2024-05-03T00:10:00', 12, 3.0)
+    )
+    
+    data = app.process_data('2024-05-02', '2024-05-02')
+    assert data['chart_data'] == {}
+    
+    data = app.process_data('2024-05-03', '2024-05-03')
+    assert data['stats']['pressure']['min'] == 3.0
+    assert data['stats']['pressure']['mean'] == 3.0
+    assert len(data['chart_data']['pressure']['timestamps']) == 56
+    
+    # Senza intervallo l'interpolazione attraversa il 2 maggio
+    data = app.process_data()
+    assert data['stats']['pressure']['min'] == 1.0
+    assert 1.0 < data['stats']['pressure']['mean'] < 3.0
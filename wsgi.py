@@ -0,0 +1,5 @@
+# Punto di ingresso WSGI per gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+from app import app, refresh_cache
+
+# Con preload_app i dati caricati qui sono condivisi dai worker dopo il fork
+refresh_cache()